@@ -3,6 +3,10 @@ import sys
 import os
 from pathlib import Path
 import subprocess
+import importlib.util
+import socket
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 
 print("""
 ⚡⚡⚡⚡⚡⚡⚡⚡⚡⚡⚡⚡⚡⚡⚡⚡⚡⚡⚡⚡
@@ -25,73 +29,101 @@ except Exception as e:
     print(f"⚠️ Could not load MCP configuration: {e}")
 
 # Install any missing dependencies
+# pip name -> import name. Packages are probed with find_spec so a warm
+# install never spawns pip; misses are installed with a single pip call.
 print("🔧 Checking dependencies...")
-required = [
-    "opencv-python",
-    "openai", 
-    "numpy",
-    "Pillow",
-    "mss",
-    "psutil",
-    "aiohttp",
-    "flask",
-    "flask-socketio",
-    "flask-cors",
-    "pyttsx3",
-    "pywin32",
-    "pypiwin32",
-    "langdetect",
-    "python-socketio[client]",
-    "eventlet"
-]
-
-try:
-    import cv2
-    import openai
-    import numpy
-    import PIL
-    import mss
-    import psutil
-    import flask
-    import flask_socketio
-    import pyttsx3
-    import langdetect
-    print("✅ Core dependencies OK!")
-except ImportError:
-    print("📦 Installing missing dependencies...")
-    subprocess.check_call([sys.executable, "-m", "pip", "install"] + required)
+required = {
+    "opencv-python": "cv2",
+    "openai": "openai",
+    "numpy": "numpy",
+    "Pillow": "PIL",
+    "mss": "mss",
+    "psutil": "psutil",
+    "aiohttp": "aiohttp",
+    "flask": "flask",
+    "flask-socketio": "flask_socketio",
+    "flask-cors": "flask_cors",
+    "pyttsx3": "pyttsx3",
+    "langdetect": "langdetect",
+    "python-socketio[client]": "socketio",
+    "eventlet": "eventlet",
+}
+if sys.platform == "win32":
+    required["pywin32"] = "win32api"
+    required["pypiwin32"] = "win32api"
 
 # Optional dependencies
-optional = ["gputil", "pyautogui", "keyboard", "mouse", "alpaca-trade-api", "pygetwindow"]
-for pkg in optional:
-    try:
-        subprocess.check_call([sys.executable, "-m", "pip", "install", pkg], 
-                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    except:
-        pass
-
-# Install streaming dependencies
-streaming_deps = ["flask", "flask-socketio", "flask-cors", "pyttsx3", "pywin32", "pypiwin32", "langdetect"]
-print("📦 Installing streaming dependencies...")
-for pkg in streaming_deps:
+optional = {
+    "gputil": "GPUtil",
+    "pyautogui": "pyautogui",
+    "keyboard": "keyboard",
+    "mouse": "mouse",
+    "alpaca-trade-api": "alpaca_trade_api",
+    "pygetwindow": "pygetwindow",
+    "simplejpeg": "simplejpeg",
+    "pybase64": "pybase64",
+    "orjson": "orjson",
+    "xxhash": "xxhash",
+}
+
+
+def missing_packages(packages):
+    """Return the pip names whose import name cannot be found."""
+    return [pkg for pkg, module in packages.items() if importlib.util.find_spec(module) is None]
+
+
+def pip_install(packages, quiet=False):
+    """Install all given packages with a single pip invocation."""
+    cmd = [sys.executable, "-m", "pip", "install",
+           "--disable-pip-version-check", "--no-input", *packages]
+    if quiet:
+        subprocess.check_call(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    else:
+        subprocess.check_call(cmd)
+
+
+missing = missing_packages(required)
+if missing:
+    print(f"📦 Installing missing dependencies: {', '.join(missing)}")
     try:
-        print(f"   Installing {pkg}...")
-        subprocess.check_call([sys.executable, "-m", "pip", "install", pkg])
+        pip_install(missing)
     except Exception as e:
-        print(f"   ⚠️ Failed to install {pkg}: {e}")
+        print(f"   ⚠️ Failed to install dependencies: {e}")
+else:
+    print("✅ Core dependencies OK!")
+
+missing = missing_packages(optional)
+if missing:
+    try:
+        pip_install(missing, quiet=True)
+    except Exception:
+        # One unavailable package fails the whole batch; retry one by one
+        for pkg in missing:
+            try:
+                pip_install([pkg], quiet=True)
+            except Exception:
+                pass
+
+# Warm up heavy modules in the background while the MCP servers and
+# LM Studio start; they don't depend on each other and C extensions
+# release the GIL while loading
+preload = ThreadPoolExecutor(max_workers=8)
+for module in ("cv2", "openai", "numpy", "PIL", "mss", "psutil",
+               "flask", "flask_socketio", "pyttsx3", "langdetect"):
+    preload.submit(importlib.import_module, module)
+preload.shutdown(wait=False)
 
 # Fix pywin32 postinstall
 print("🔧 Configuring pywin32...")
 try:
-    # Try to run pywin32_postinstall
-    subprocess.check_call([sys.executable, "-m", "pywin32_postinstall", "-install"])
-    print("   ✅ pywin32 configured successfully")
-except:
-    # Alternative method
+    # Already configured: skip the slow postinstall
+    import win32com.client
+    print("   ✅ pywin32 is working")
+except ImportError:
     try:
-        import win32com.client
-        print("   ✅ pywin32 is working")
-    except:
+        subprocess.check_call([sys.executable, "-m", "pywin32_postinstall", "-install"])
+        print("   ✅ pywin32 configured successfully")
+    except Exception:
         print("   ⚠️ pywin32 configuration failed, TTS might not work")
 
 # Start MCP servers
@@ -108,14 +140,40 @@ for server in enabled_servers:
         extra_args = ["--db-path", mcp_config.MEMORY_DB_PATH]
     cmd = [sys.executable, server_file, "--port", str(port)] + extra_args
     proc = subprocess.Popen(cmd)
-    mcp_processes.append(proc)
+    mcp_processes.append((server, port, proc))
     print(f"✅ Started {server} MCP server on port {port}")
-time.sleep(5)  # Wait for servers to initialize
-print("✅ All MCP servers started")
+
+
+def wait_ready(port, proc, deadline):
+    """Poll the server port until it accepts connections or the deadline passes."""
+    delay = 0.05
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            return False  # Server exited, no point in waiting
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return True
+        except OSError:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+    return False
+
+
+# Wait for every server in parallel instead of sleeping a fixed amount
+if mcp_processes:
+    deadline = time.monotonic() + 15
+    with ThreadPoolExecutor(max_workers=len(mcp_processes)) as pool:
+        ready = list(pool.map(lambda item: wait_ready(item[1], item[2], deadline), mcp_processes))
+    for (server, port, _), ok in zip(mcp_processes, ready):
+        if not ok:
+            print(f"⚠️ {server} MCP server not reachable on port {port}")
+    if all(ready):
+        print("✅ All MCP servers started")
 
 # --- LM Studio Automation (Simplified) ---
 
 LM_STUDIO_PATH = "C:\\Program Files\\LM Studio\\LM Studio.exe"
+LM_STUDIO_MODELS_URL = "http://127.0.0.1:1234/v1/models"
 
 if os.path.exists(LM_STUDIO_PATH):
     print(f"\n🚀 Launching LM Studio...")
@@ -125,8 +183,18 @@ if os.path.exists(LM_STUDIO_PATH):
         print("\n   --- ACTION REQUIRED ---")
         print("   Please load your model in LM Studio and start the server.")
         print("   -----------------------")
-        print("\n   Waiting 10 seconds before starting Lilith...")
-        time.sleep(10)
+        print("\n   Waiting for the LM Studio server (up to 60 seconds)...")
+        start = time.monotonic()
+        deadline = start + 60
+        while time.monotonic() < deadline:
+            try:
+                urllib.request.urlopen(LM_STUDIO_MODELS_URL, timeout=0.5).close()
+                print(f"   ✅ LM Studio server ready after {time.monotonic() - start:.1f}s")
+                break
+            except Exception:
+                time.sleep(0.25)
+        else:
+            print("   ⚠️ LM Studio server not responding yet, starting Lilith anyway")
     except Exception as e:
         print(f"   ❌ Failed to launch LM Studio: {e}")
 else:
@@ -1,14 +1,24 @@
 """Configuration settings for Lilith."""
+from dataclasses import dataclass
 from pathlib import Path
+from types import MappingProxyType
 
 # LM Studio settings
 LM_STUDIO_URL = "http://localhost:1234/v1"
 MODEL_NAME = "local-model"  # This is the default name LM Studio uses
 
-# Screen capture settings
-SCREEN_FPS = 15  # Frames per second for screen capture
-SCREEN_MAX_WIDTH = 1280  # Maximum width for screen capture (resized if larger)
-SCREEN_QUALITY = 85  # JPEG quality (1-100)
+# Screen capture settings, read once when a capture loop starts
+@dataclass(frozen=True)
+class _Cfg:
+    screen_fps: int = 15  # Frames per second for screen capture
+    screen_max_width: int = 1280  # Maximum width for screen capture (resized if larger)
+    screen_quality: int = 85  # JPEG quality (1-100)
+
+CFG = _Cfg()
+
+SCREEN_FPS = CFG.screen_fps
+SCREEN_MAX_WIDTH = CFG.screen_max_width
+SCREEN_QUALITY = CFG.screen_quality
 
 # UI settings
 SERVER_HOST = "0.0.0.0"
@@ -30,42 +40,42 @@ DEFAULT_PERSONALITY = "Playful"
 REACTION_FREQUENCY = 3  # Show a reaction every N messages
 
 # Safety settings
-ALLOWED_COMMANDS = [
+ALLOWED_COMMANDS = frozenset({
     "ls", "dir", "pwd", "cd", "echo", "cat", "type", "find", 
     "grep", "pip", "python", "node", "npm", "git", "curl", "wget"
-]
+})
 
 # Avatar settings
 AVATAR_URL = "https://api.dicebear.com/7.x/bottts-neutral/svg?seed=Lilith&backgroundColor=b6e3f4"
 
 # Welcome messages (randomly selected)
-WELCOME_MESSAGES = [
+WELCOME_MESSAGES = (
     "Hey! I'm Lilith, your AI coding companion! 👾\n\nI can help you code, debug, and build awesome projects! Enable screen sharing if you want me to see what you're working on. What would you like to create today? 🚀",
     "Yo! Lilith here! 🎮\n\nReady to code something amazing? I can see your screen, write code, and help you build whatever you can imagine! Let's make something cool! 💻✨",
     "Hi there! I'm Lilith! 👋\n\nThink of me as your coding buddy who never sleeps! I can help debug, create projects, and make coding fun! What's on your mind today? 🤔",
     "Welcome! I'm Lilith, your friendly neighborhood code companion! 🕷️\n\nFrom games to websites to automation scripts, I'm here to help you build it all! What adventure shall we embark on? 🗺️"
-]
+)
 
 # Example prompts organized by category
-EXAMPLE_CATEGORIES = {
-    "Games": [
+EXAMPLE_CATEGORIES = MappingProxyType({
+    "Games": (
         "Create a snake game with pygame",
         "Make a text-based RPG adventure",
         "Build a simple platformer game"
-    ],
-    "Web Development": [
+    ),
+    "Web Development": (
         "Create a portfolio website with animations",
         "Build a real-time chat application",
         "Make a todo app with local storage"
-    ],
-    "Automation": [
+    ),
+    "Automation": (
         "Create a file organizer script",
         "Build a web scraper for news",
         "Make a Discord bot"
-    ],
-    "AI & Data": [
+    ),
+    "AI & Data": (
         "Create a sentiment analysis script",
         "Build a simple chatbot",
         "Make a data visualization dashboard"
-    ]
-}
\ No newline at end of file
+    )
+})
\ No newline at end of file
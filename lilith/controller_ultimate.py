@@ -9,17 +9,19 @@ from __future__ import annotations
 from pathlib import Path
 import base64
 from openai import OpenAI
+import httpx
 import numpy as np
 import cv2
 import json
 import re
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Iterator, Optional, List
 import random
 from datetime import datetime
 import asyncio
 import os
 import threading
-import concurrent.futures
+import functools
+from collections import OrderedDict
 import psutil
 import logging
 
@@ -34,16 +36,92 @@ from .lm_studio_connector import get_lm_studio_connector
 
 # Try MCP manager (optional)
 try:
-    from .mcp_manager import mcp_manager
+    from .mcp_manager import mcp_manager, mcp_mouse_click
     MCP_AVAILABLE = True
 except ImportError:
     MCP_AVAILABLE = False
     mcp_manager = None  # type: ignore
+    mcp_mouse_click = None  # type: ignore
+
+# SIMD base64 (optional, stdlib fallback)
+try:
+    from pybase64 import b64encode_as_string
+except ImportError:
+    def b64encode_as_string(data) -> str:
+        return base64.b64encode(data).decode("ascii")
+
+# Encodeur JPEG libjpeg-turbo (optionnel, fallback cv2.imencode)
+try:
+    import simplejpeg
+    SIMPLEJPEG_AVAILABLE = True
+except ImportError:
+    SIMPLEJPEG_AVAILABLE = False
+
+# Parseur JSON rapide pour les appels d'outils (orjson optionnel)
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
+# Hash rapide des frames pour le cache d'encodage (xxhash optionnel)
+try:
+    import xxhash
+
+    def _frame_digest(data):
+        return xxhash.xxh3_64_intdigest(data)
+except ImportError:
+    import hashlib
+
+    def _frame_digest(data):
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+# Images envoyées au modèle : JPEG qualité 75, bord long max 1280 px
+_JPEG_QUALITY = 75
+_IMAGE_MAX_EDGE = 1280
+
+# Nombre d'images encodées gardées en cache (mode observation : frames répétées)
+_ENCODE_CACHE_SIZE = 8
 
 # Logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s: %(message)s")
 log = logging.getLogger("controller")
 
+# ----------------------------------------------------------------------
+#  Command patterns (compilés une seule fois)
+# ----------------------------------------------------------------------
+# Une seule alternance : le texte n'est parcouru qu'une fois, le type de
+# commande est donné par le nom du groupe qui a matché (m.lastgroup)
+_COMMAND_RE = re.compile(
+    r'(?P<json_tool>\{\s*"name"\s*:\s*".+?"\s*,\s*"arguments"\s*:\s*\{.*?\}\s*\})'
+    r"|(?i:EXECUTE_PYTHON:\s*```(?P<execute_python>.*?)```)"
+    r"|(?i:RUN_COMMAND:\s*```(?P<run_command>.*?)```)",
+    re.DOTALL,
+)
+
+# Prompt système : seule la personnalité varie d'un appel à l'autre
+_SYSTEM_PROMPT_TEMPLATE = """You are Lilith (personality: {personality})
+schema_version: 0.3
+TOOLS:
+- execute_python(code, timeout)
+- execute_command(command, timeout)
+- read_file(filepath)
+- type_text(text, interval)
+- click_screen(x,y | x_rel,y_rel, button)
+- move_mouse(x,y | x_rel,y_rel, duration)
+- take_screenshot()
+
+RULES:
+• When calling a tool, reply ONLY with the JSON object {{ "name": "...", "arguments": {{...}} }}.
+• No other text in that message.
+• Use x_rel / y_rel (0-1) when derived from an image.
+"""
+
+
+@functools.lru_cache(maxsize=16)
+def _system_prompt(personality: str) -> str:
+    return _SYSTEM_PROMPT_TEMPLATE.format(personality=personality)
+
+
 # ----------------------------------------------------------------------
 #  Controller class
 # ----------------------------------------------------------------------
@@ -53,7 +131,18 @@ class LilithControllerUltimate:
     def __init__(self, base_url: str = "http://127.0.0.1:1234"):
         self.base_url = base_url.rstrip("/")
         self.api_url = f"{self.base_url}/v1"
-        self.client = OpenAI(base_url=self.api_url, api_key="not-needed")
+        # Client HTTP persistant : connexions keep-alive réutilisées entre les tours.
+        # Pas de HTTP/2 : LM Studio sert du HTTP/1.1 en clair
+        # Les limites vont sur le transport : httpx.Client ignore limits= quand transport= est fourni
+        self._http = httpx.Client(
+            # Lecture à 600 s (défaut du SDK) : une génération locale peut être longue
+            timeout=httpx.Timeout(600.0, connect=5.0),
+            transport=httpx.HTTPTransport(
+                retries=1,
+                limits=httpx.Limits(max_connections=16, max_keepalive_connections=8, keepalive_expiry=60.0),
+            ),
+        )
+        self.client = OpenAI(base_url=self.api_url, api_key="not-needed", http_client=self._http)
 
         # Optional LM-Studio connector
         try:
@@ -63,23 +152,64 @@ class LilithControllerUltimate:
             self.lm_connector = None
 
         self.tools = LilithTools()
-        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=10)
+
+        # Taille du bureau virtuel, lue une seule fois (projection des ratios)
+        try:
+            import pyautogui
+            self._screen_size = tuple(pyautogui.size())
+        except Exception:
+            # Inconnue : les clics relatifs échoueront au lieu de viser une taille devinée
+            self._screen_size = None
+
+        # LRU (hash, shape) -> base64 JPEG, évite de ré-encoder une frame identique
+        self._encode_cache: OrderedDict = OrderedDict()
+        self._encode_lock = threading.Lock()
+
+        # Table de dispatch des outils : nom (ou type legacy) -> handler
+        self._TOOL_HANDLERS = {
+            "type_text": self._h_type_text,
+            "click_screen": self._h_click_screen,
+            "move_mouse": self._h_move_mouse,
+            "take_screenshot": self._h_take_screenshot,
+            "execute_python": self._h_execute_python,
+            "execute_command": self._h_execute_command,
+            "read_file": self._h_read_file,
+        }
+        # Blocs legacy ```execute_python``` / ```run_command``` : table séparée
+        self._LEGACY_HANDLERS = {
+            "execute_python": self._h_execute_python,
+            "run_command": self._h_run_command,
+        }
+
+        # Boucle asyncio persistante pour les appels MCP (créée une seule fois)
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._loop_thread.start()
 
         # Start MCP servers async (if available)
         if MCP_AVAILABLE:
             threading.Thread(target=self._init_mcp_async, daemon=True).start()
 
+    def __del__(self):
+        loop = getattr(self, "_loop", None)
+        if loop is not None and loop.is_running():
+            loop.call_soon_threadsafe(loop.stop)
+        http = getattr(self, "_http", None)
+        if http is not None:
+            http.close()
+
+    def _run_coro(self, coro):
+        """Exécute une coroutine sur la boucle persistante et attend son résultat."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
     # ------------------------------------------------------------------
     #  MCP server initialisation (unchanged except for logging)
     # ------------------------------------------------------------------
     def _init_mcp_async(self):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        if loop.run_until_complete(mcp_manager.start_server("ab498_control")):
+        if self._run_coro(mcp_manager.start_server("ab498_control")):
             log.info("✅ AB498 Control server detected & started")
         else:
             log.warning("⚠️  AB498 Control server unavailable")
-        loop.close()
 
     # ------------------------------------------------------------------
     #  Chat entry point
@@ -96,22 +226,22 @@ class LilithControllerUltimate:
         """Send a chat message to the language model and post-process tool-calls."""
         messages = self._build_prompt(user_msg, image_frame, personality, stream_context)
 
-        # --- completions ---
-        response = self._llm_complete(messages, max_tokens, temperature)
-        if not response:
+        # --- completions (streamées, assemblées à la fin) ---
+        chunks = list(self._llm_complete_stream(messages, max_tokens, temperature))
+        if not chunks:
             return "❌ Unable to get response from LM Studio."
 
-        ai_response = response.choices[0].message.content
+        ai_response = "".join(chunks)
 
         # --- detect / execute tools (sync) ---
-        commands = self._extract_all_commands(ai_response)
+        commands, stripped = self._scan_commands(ai_response)
         if commands:
             results = self._execute_sync_commands(commands)
             # Enlève la partie tool-call du texte avant de retourner
-            ai_response = self._strip_command_blocks(ai_response)
+            ai_response = stripped
 
             if results:
-                ai_response += "\n\n" + "\n".join(results)
+                ai_response = "".join((ai_response, "\n\n", "\n".join(results)))
 
         return ai_response
 
@@ -126,22 +256,7 @@ class LilithControllerUltimate:
         stream_context: dict | None,
     ) -> list[dict]:
         """Construit le prompt system + user (version abrégée pour lisibilité)."""
-        system_prompt = f"""You are Lilith (personality: {personality})
-schema_version: 0.3
-TOOLS:
-- execute_python(code, timeout)
-- execute_command(command, timeout)
-- read_file(filepath)
-- type_text(text, interval)
-- click_screen(x,y | x_rel,y_rel, button)
-- move_mouse(x,y | x_rel,y_rel, duration)
-- take_screenshot()
-
-RULES:
-• When calling a tool, reply ONLY with the JSON object {{ "name": "...", "arguments": {{...}} }}.
-• No other text in that message.
-• Use x_rel / y_rel (0-1) when derived from an image.
-"""
+        system_prompt = _system_prompt(personality)
         messages = [{"role": "system", "content": system_prompt}]
         content_block = [{"type": "text", "text": user_msg}]
         if image_frame is not None:
@@ -156,111 +271,183 @@ RULES:
     #  Helpers
     # ------------------------------------------------------------------
     def _encode_image(self, frame: np.ndarray) -> str:
-        _, buf = cv2.imencode(".jpg", frame)
-        return base64.b64encode(buf).decode()
+        frame = np.ascontiguousarray(frame)
+        key = (_frame_digest(frame), frame.shape)
+        with self._encode_lock:
+            cached = self._encode_cache.get(key)
+            if cached is not None:
+                self._encode_cache.move_to_end(key)
+                return cached
+
+        # Bord long borné : le modèle de vision n'a pas besoin de plus
+        h, w = frame.shape[:2]
+        long_edge = max(h, w)
+        if long_edge > _IMAGE_MAX_EDGE:
+            frame = cv2.resize(
+                frame,
+                (w * _IMAGE_MAX_EDGE // long_edge, h * _IMAGE_MAX_EDGE // long_edge),
+                interpolation=cv2.INTER_AREA,
+            )
 
-    def _llm_complete(self, messages: list, max_tokens: int, temperature: float):
-        """Appelle LM Studio directement (sans streaming)."""
+        if SIMPLEJPEG_AVAILABLE and frame.ndim == 3 and frame.shape[2] == 3:
+            # 4:2:0 comme cv2.imencode (simplejpeg est en 4:4:4 par défaut)
+            buf = simplejpeg.encode_jpeg(
+                frame, quality=_JPEG_QUALITY, colorspace="BGR", colorsubsampling="420", fastdct=True
+            )
+        else:
+            _, buf = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), _JPEG_QUALITY])
+        img_b64 = b64encode_as_string(buf)
+
+        with self._encode_lock:
+            self._encode_cache[key] = img_b64
+            if len(self._encode_cache) > _ENCODE_CACHE_SIZE:
+                self._encode_cache.popitem(last=False)
+        return img_b64
+
+    def _llm_complete_stream(self, messages: list, max_tokens: int, temperature: float) -> Iterator[str]:
+        """Appelle LM Studio en streaming et renvoie les morceaux de texte au fil de l'eau."""
+        produced = False
         try:
-            return self.client.chat.completions.create(
+            stream = self.client.chat.completions.create(
                 model="local-model",
                 messages=messages,
                 temperature=temperature,
                 max_tokens=max_tokens,
-                stream=False,
+                stream=True,
             )
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                tok = chunk.choices[0].delta.content
+                if tok:
+                    produced = True
+                    yield tok
         except Exception as e:
             log.error("LLM completion failed: %s", e)
-            return None
+            # Coupure en cours de flux : on signale la troncature au lieu de la masquer
+            if produced:
+                yield f"\n\n❌ Response interrupted: {e}"
 
     # ------------------------------------------------------------------
     #  Command detection (nouveau JSON + anciens regex)
     # ------------------------------------------------------------------
-    def _extract_all_commands(self, text: str) -> list[dict]:
-        """Renvoie une liste d’objets commande {'type':…, 'name':…, 'args':…}."""
+    def _scan_commands(self, text: str) -> tuple[list[dict], str]:
+        """Une seule passe : (commandes, texte sans les blocs de commande)."""
         commands: list[dict] = []
 
-        # --- NEW JSON TOOL-CALL DETECTION --------------------------------
-        json_pattern = r'\{\s*"name"\s*:\s*".+?"\s*,\s*"arguments"\s*:\s*\{.*?\}\s*\}'
-        for m in re.finditer(json_pattern, text, re.DOTALL):
-            try:
-                obj = json.loads(m.group(0))
-                if "name" in obj and "arguments" in obj:
-                    commands.append({"type": "json_tool", "name": obj["name"], "args": obj["arguments"]})
-            except json.JSONDecodeError:
-                pass  # ignore malformed
-
-        # --- LEGACY COMMANDS (extraits comme avant) ----------------------
-        legacy = {
-            "execute_python": r"EXECUTE_PYTHON:\s*```(.*?)```",
-            "run_command": r"RUN_COMMAND:\s*```(.*?)```",
-        }
-        for typ, pat in legacy.items():
-            for m in re.finditer(pat, text, re.DOTALL | re.IGNORECASE):
-                commands.append({"type": typ, "code": m.group(1).strip()})
-
-        return commands
+        # Réponse sans appel d'outil (cas le plus fréquent) : pas de scan regex.
+        # Tout appel JSON contient "name", tout bloc legacy une clôture ```
+        if '"name"' not in text and "```" not in text:
+            return commands, text.strip()
+
+        kept: list[str] = []
+        pos = 0
+        for m in _COMMAND_RE.finditer(text):
+            # Les blocs reconnus sont retirés du texte affiché
+            kept.append(text[pos:m.start()])
+            pos = m.end()
+
+            kind = m.lastgroup
+            if kind == "json_tool":
+                # --- NEW JSON TOOL-CALL DETECTION ----------------------------
+                try:
+                    obj = _json_loads(m.group(kind))
+                    if "name" in obj and "arguments" in obj:
+                        commands.append({"type": "json_tool", "name": obj["name"], "args": obj["arguments"]})
+                except ValueError:
+                    pass  # ignore malformed
+            else:
+                # --- LEGACY COMMANDS (EXECUTE_PYTHON / RUN_COMMAND) ----------
+                commands.append({"type": kind, "code": m.group(kind).strip()})
+        kept.append(text[pos:])
+
+        return commands, "".join(kept).strip()
 
     # ------------------------------------------------------------------
     #  Synchronised execution
     # ------------------------------------------------------------------
     def _execute_sync_commands(self, cmds: list[dict]) -> list[str]:
-        results: list[str] = []
+        """Exécute les commandes une par une, dans l'ordre du texte.
 
-        for cmd in cmds:
-            if cmd["type"] == "json_tool":
-                name, args = cmd["name"], cmd["args"]
-                try:
-                    if name == "type_text":
-                        type_text(**args)
-                        results.append("⌨️ Typed.")
-                    elif cmd["action"] == "click":
-                    xs, ys = cmd["params"].split()[:2]
-
-                     # ───────────  NOUVEAU  ───────────
-                    import pyautogui
-                    scr_w, scr_h = pyautogui.size()          # taille du bureau virtuel
-                    x = float(xs)
-                    y = float(ys)
-                    # si les valeurs sont des ratios 0-1, on les projette en pixels
-                    if 0.0 <= x <= 1.0 and 0.0 <= y <= 1.0:
-                        x *= scr_w
-                        y *= scr_h
-                     x = int(round(x))
-                     y = int(round(y))
-                     # ─────────────────────────────────
-
-                     await mcp_mouse_click(x, y)
-                     return f"🖱️ **Clicked at:** ({x}, {y})"
-                    elif name == "move_mouse":
-                        move_mouse(**args)
-                        results.append("↔️ Moved.")
-                    elif name == "take_screenshot":
-                        img = take_screenshot()
-                        results.append(f"📸 Screenshot captured ({len(img)//1024} KB).")
-                    else:
-                        results.append(f"⚠️ Unknown tool '{name}'.")
-                except Exception as e:
-                    results.append(f"❌ Error running {name}: {e}")
-
-            elif cmd["type"] == "execute_python":
-                r = self.tools.execute_python(cmd["code"])
-                results.append(f"🐍 Python → {r['stdout'] or r['stderr']}")
-            elif cmd["type"] == "run_command":
-                r = self.tools.execute_command(cmd["code"])
-                results.append(f"🖥️ CMD → {r['stdout'] or r['stderr']}")
-
-        return results
+        Le modèle les écrit comme un script (écrire un fichier puis le lancer,
+        ouvrir une fenêtre puis y taper) : elles ne sont jamais parallélisées.
+        """
+        return [self._dispatch_one(cmd) for cmd in cmds]
+
+    def _dispatch_one(self, cmd: dict) -> str:
+        if cmd["type"] == "json_tool":
+            name, args = cmd["name"], cmd["args"]
+            handler = self._TOOL_HANDLERS.get(name)
+        else:
+            name, args = cmd["type"], {"code": cmd["code"]}
+            handler = self._LEGACY_HANDLERS.get(name)
+        if handler is None:
+            return f"⚠️ Unknown tool '{name}'."
+        try:
+            return handler(args)
+        except Exception as e:
+            return f"❌ Error running {name}: {e}"
 
     # ------------------------------------------------------------------
-    #  Strip command blocks from AI answer (avoid echoing raw JSON)
+    #  Tool handlers (un par outil, renvoient le texte de résultat)
     # ------------------------------------------------------------------
-    @staticmethod
-    def _strip_command_blocks(text: str) -> str:
-        text = re.sub(r'\{\s*"name"\s*:.*?\}\s*', "", text, flags=re.DOTALL)
-        text = re.sub(r"EXECUTE_PYTHON:\s*```.*?```", "", text, flags=re.DOTALL | re.IGNORECASE)
-        text = re.sub(r"RUN_COMMAND:\s*```.*?```", "", text, flags=re.DOTALL | re.IGNORECASE)
-        return text.strip()
+    def _h_type_text(self, args: dict) -> str:
+        type_text(**args)
+        return "⌨️ Typed."
+
+    def _screen_wh(self) -> tuple[int, int]:
+        if self._screen_size is None:
+            raise RuntimeError("screen size unknown (pyautogui unavailable), cannot project relative coordinates")
+        return self._screen_size
+
+    def _h_click_screen(self, args: dict) -> str:
+        button = args.get("button", "left")
+        if args.get("x_rel") is not None and args.get("y_rel") is not None:
+            scr_w, scr_h = self._screen_wh()
+            x, y = float(args["x_rel"]) * scr_w, float(args["y_rel"]) * scr_h
+        else:
+            x, y = float(args["x"]), float(args["y"])
+            # si les valeurs sont des ratios 0-1, on les projette en pixels
+            if 0.0 <= x <= 1.0 and 0.0 <= y <= 1.0:
+                scr_w, scr_h = self._screen_wh()
+                x *= scr_w
+                y *= scr_h
+        x = int(round(x))
+        y = int(round(y))
+
+        if MCP_AVAILABLE:
+            res = self._run_coro(mcp_mouse_click(x, y, button))
+            if isinstance(res, dict) and res.get("error"):
+                raise RuntimeError(res["error"])
+        else:
+            click_screen(x=x, y=y, button=button)
+        return f"🖱️ **Clicked at:** ({x}, {y})"
+
+    def _h_move_mouse(self, args: dict) -> str:
+        move_mouse(**args)
+        return "↔️ Moved."
+
+    def _h_take_screenshot(self, args: dict) -> str:
+        img = take_screenshot()
+        return f"📸 Screenshot captured ({len(img)//1024} KB)."
+
+    def _h_execute_python(self, args: dict) -> str:
+        r = self.tools.execute_python(args["code"], int(args.get("timeout", 10)))
+        return f"🐍 Python → {r['stdout'] or r['stderr']}"
+
+    def _h_execute_command(self, args: dict) -> str:
+        r = self.tools.execute_command(args["command"], int(args.get("timeout", 30)))
+        return f"🖥️ CMD → {r['stdout'] or r['stderr']}"
+
+    def _h_read_file(self, args: dict) -> str:
+        r = self.tools.read_file(args["filepath"])
+        if not r["success"]:
+            raise RuntimeError(r["error"])
+        return f"📄 {args['filepath']} →\n{r['content']}"
+
+    def _h_run_command(self, args: dict) -> str:
+        r = self.tools.execute_command(args["code"])
+        return f"🖥️ CMD → {r['stdout'] or r['stderr']}"
 
 
 # ----------------------------------------------------------------------
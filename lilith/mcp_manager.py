@@ -226,12 +226,13 @@ class MCPManager:
         srv = self.servers.get(name)
         if not srv:
             return {"error": "unknown server"}
+        running = srv.is_running()
         return {
             "name": srv.name,
-            "running": srv.is_running(),
+            "running": running,
             "enabled": srv.enabled,
             "port": srv.port,
-            "pid": srv.process.pid if srv.is_running() else None,
+            "pid": srv.process.pid if running else None,
         }
 
     def get_all_status(self) -> dict[str, dict[str, Any]]:
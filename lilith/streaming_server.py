@@ -6,6 +6,7 @@ import base64
 import cv2
 import numpy as np
 import threading
+import queue
 import time
 import mss
 from pathlib import Path
@@ -16,13 +17,52 @@ import asyncio
 from datetime import datetime
 import langdetect  # Pour détection de langue
 
+# libjpeg-turbo bindings: faster than cv2.imencode and reads BGRA directly
+try:
+    import simplejpeg
+    SIMPLEJPEG_AVAILABLE = True
+except ImportError:
+    SIMPLEJPEG_AVAILABLE = False
+
+# SIMD base64 codec, falling back to the stdlib one
+try:
+    from pybase64 import b64decode, b64encode_as_string
+except ImportError:
+    from base64 import b64decode
+    
+    def b64encode_as_string(data):
+        """Base64-encode bytes straight to a str."""
+        return base64.b64encode(data).decode('ascii')
+
 # Import Lilith controller
 from .controller_ultimate import LilithControllerUltimate
+from .config import CFG
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'lilith-ai-secret-key'
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+
+# orjson-backed json module for Socket.IO packets, which mostly carry
+# large base64 frames; python-socketio needs dumps() to return a str
+try:
+    import orjson
+    
+    class _OrjsonCodec:
+        """Minimal json-module interface on top of orjson."""
+        
+        @staticmethod
+        def dumps(obj, **kwargs):
+            return orjson.dumps(obj).decode('utf-8')
+        
+        @staticmethod
+        def loads(s, **kwargs):
+            return orjson.loads(s)
+    
+    socketio_json = _OrjsonCodec
+except ImportError:
+    socketio_json = json
+
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading', json=socketio_json)
 
 # Initialize components
 controller = None
@@ -186,7 +226,7 @@ class StreamingState:
         self.chat_history = []
         self.current_ai_frame = None
         self.current_vtube_frame = None
-        self.tts_queue = []
+        self.tts_queue = queue.Queue(maxsize=32)
         self.tts_thread = None
         self.lock = threading.Lock()
         # Dynamic reaction system
@@ -221,11 +261,16 @@ def tts_worker():
         'en': None
     }
     
+    # Text that hit a busy engine and must be spoken again
+    pending = None
+    
     while True:
         try:
-            if state.tts_queue and TTS_AVAILABLE:
-                text = state.tts_queue.pop(0)
-                
+            # Block until something needs to be spoken instead of polling
+            text = pending if pending is not None else state.tts_queue.get()
+            pending = None
+            
+            if TTS_AVAILABLE:
                 # Skip empty texts
                 if not text or not text.strip():
                     continue
@@ -300,8 +345,8 @@ def tts_worker():
                 except RuntimeError as e:
                     # Common error when TTS is busy
                     print(f"TTS busy: {e}")
-                    # Put text back in queue
-                    state.tts_queue.insert(0, text)
+                    # Retry the same text first
+                    pending = text
                     time.sleep(0.5)
                     
                 except Exception as e:
@@ -332,8 +377,6 @@ def tts_worker():
                             print(f"Error during TTS reinitialization: {reinit_error}")
                             time.sleep(5)
             
-            time.sleep(0.1)
-            
         except Exception as e:
             print(f"Critical error in TTS worker: {e}")
             time.sleep(1)
@@ -382,45 +425,92 @@ def clean_text_for_tts(text):
     
     return text.strip()
 
+def queue_tts(text):
+    """Queue text for the TTS worker without blocking; drops it if the queue is full."""
+    try:
+        state.tts_queue.put_nowait(text)
+    except queue.Full:
+        pass
+
 # Start TTS worker only if TTS is available
 if TTS_AVAILABLE:
     state.tts_thread = threading.Thread(target=tts_worker, daemon=True)
     state.tts_thread.start()
 
+def encode_jpeg(frame, quality):
+    """Encode a BGR or BGRA frame to JPEG, using libjpeg-turbo when available."""
+    if SIMPLEJPEG_AVAILABLE:
+        colorspace = 'BGRX' if frame.shape[2] == 4 else 'BGR'
+        # 4:2:0 like cv2.imencode; simplejpeg defaults to 4:4:4
+        return simplejpeg.encode_jpeg(np.ascontiguousarray(frame), quality=quality,
+                                      colorspace=colorspace, colorsubsampling='420',
+                                      fastdct=True)
+    if frame.shape[2] == 4:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer
+
+def shrink(img, size):
+    """Resize img to size (width, height), halving with pyrDown first on large downscales."""
+    width, height = size
+    interpolation = cv2.INTER_AREA
+    while img.shape[1] >= 2 * width and img.shape[0] >= 2 * height:
+        img = cv2.pyrDown(img)
+        interpolation = cv2.INTER_LINEAR
+    return cv2.resize(img, size, interpolation=interpolation)
+
 def capture_ai_screen():
     """Capture AI's screen (server-side)."""
     with mss.mss() as sct:
         # Use monitor 2 if available, otherwise monitor 1
         monitor_idx = 2 if len(sct.monitors) > 2 else 1
+        # BGR frame for the cv2.imencode fallback, reused across grabs while the size is stable
+        frame_buf = None
+        # Raw pixels of the last encoded grab
+        last_raw = None
+        frame_interval = 0.1  # 10 FPS
+        max_width = CFG.screen_max_width
         
         while state.ai_screen_enabled:
             try:
+                started = time.perf_counter()
                 monitor = sct.monitors[monitor_idx]
                 screenshot = sct.grab(monitor)
-                frame = np.array(screenshot)
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2RGB)
                 
-                # Resize for performance
-                height, width = frame.shape[:2]
-                if width > 1280:
-                    scale = 1280 / width
-                    new_width = int(width * scale)
-                    new_height = int(height * scale)
-                    frame = cv2.resize(frame, (new_width, new_height))
-                
-                # Don't add overlay text
-                
-                # Convert to base64
-                _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-                jpg_as_text = base64.b64encode(buffer).decode('utf-8')
-                
-                with state.lock:
-                    state.current_ai_frame = jpg_as_text
-                
-                # Emit to all clients
-                socketio.emit('ai_screen_frame', {'frame': jpg_as_text})
+                # Only encode when the screen changed; mss returns a fresh
+                # buffer per grab, so the previous one can be compared as is
+                if screenshot.raw != last_raw:
+                    # View mss' raw BGRA buffer directly instead of copying it
+                    raw = np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(screenshot.height, screenshot.width, 4)
+                    if SIMPLEJPEG_AVAILABLE:
+                        # simplejpeg encodes BGRA as BGRX, no conversion needed
+                        frame = raw
+                    else:
+                        if frame_buf is None or frame_buf.shape[:2] != raw.shape[:2]:
+                            frame_buf = np.empty((screenshot.height, screenshot.width, 3), dtype=np.uint8)
+                        frame = cv2.cvtColor(raw, cv2.COLOR_BGRA2BGR, dst=frame_buf)
+                    
+                    # Resize for performance
+                    height, width = frame.shape[:2]
+                    if width > max_width:
+                        new_height = height * max_width // width
+                        frame = shrink(frame, (max_width, new_height))
+                    
+                    # Don't add overlay text
+                    
+                    # Convert to base64
+                    buffer = encode_jpeg(frame, 80)
+                    jpg_as_text = b64encode_as_string(buffer)
+                    last_raw = screenshot.raw
+                    
+                    with state.lock:
+                        state.current_ai_frame = jpg_as_text
+                    
+                    # Emit to all clients; unchanged frames are not resent
+                    socketio.emit('ai_screen_frame', {'frame': jpg_as_text})
                 
-                time.sleep(0.1)  # 10 FPS
+                # Sleep only for what is left of the frame interval
+                time.sleep(max(0.0, frame_interval - (time.perf_counter() - started)))
                 
             except Exception as e:
                 print(f"AI screen capture error: {e}")
@@ -434,28 +524,35 @@ def capture_vtube_studio():
     # Windows API functions
     user32 = ctypes.windll.user32
     gdi32 = ctypes.windll.gdi32
+    WNDENUMPROC = ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
     
+    def find_vtube_window():
+        """Return the first visible VTube Studio window handle, or None."""
+        found = []
+        
+        def enum_windows_callback(hwnd, lparam):
+            if user32.IsWindowVisible(hwnd):
+                length = user32.GetWindowTextLengthW(hwnd)
+                if length > 0:
+                    buff = ctypes.create_unicode_buffer(length + 1)
+                    user32.GetWindowTextW(hwnd, buff, length + 1)
+                    if "VTube Studio" in buff.value:
+                        found.append(hwnd)
+                        return False  # Stop enumerating at the first match
+            return True
+        
+        user32.EnumWindows(WNDENUMPROC(enum_windows_callback), 0)
+        return found[0] if found else None
+    
+    hwnd = None
     while state.vtube_stream_enabled:
         try:
-            # Find VTube Studio window using Windows API
-            def enum_windows_callback(hwnd, windows):
-                if user32.IsWindowVisible(hwnd):
-                    length = user32.GetWindowTextLengthW(hwnd)
-                    if length > 0:
-                        buff = ctypes.create_unicode_buffer(length + 1)
-                        user32.GetWindowTextW(hwnd, buff, length + 1)
-                        if "VTube Studio" in buff.value:
-                            windows.append(hwnd)
-                return True
+            # Find VTube Studio window using Windows API; the handle is kept
+            # across frames and only looked up again once it is no longer valid
+            if not hwnd or not user32.IsWindow(hwnd):
+                hwnd = find_vtube_window()
             
-            # Find VTube Studio window
-            windows = []
-            WNDENUMPROC = ctypes.WINFUNCTYPE(ctypes.c_bool, ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int))
-            user32.EnumWindows(WNDENUMPROC(enum_windows_callback), ctypes.py_object(windows))
-            
-            if windows:
-                hwnd = windows[0]
-                
+            if hwnd:
                 # Get window dimensions
                 rect = wintypes.RECT()
                 user32.GetWindowRect(hwnd, ctypes.pointer(rect))
@@ -484,14 +581,13 @@ def capture_vtube_studio():
                     
                     # Convert to numpy array
                     frame = np.frombuffer(bmpstr, dtype=np.uint8).reshape(height, width, 4)
-                    frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2RGB)
                     
                     # Flip vertically (Windows bitmaps are bottom-up)
                     frame = cv2.flip(frame, 0)
                     
                     # Convert to base64
-                    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 85])
-                    jpg_as_text = base64.b64encode(buffer).decode('utf-8')
+                    buffer = encode_jpeg(frame, 85)
+                    jpg_as_text = b64encode_as_string(buffer)
                     
                     with state.lock:
                         state.current_vtube_frame = jpg_as_text
@@ -547,6 +643,13 @@ def handle_join(data):
         'active_users': [u['username'] for u in state.active_users.values()]
     })
     
+    # The capture loop only emits on change, so send the last AI frame now
+    if state.ai_screen_enabled:
+        with state.lock:
+            frame = state.current_ai_frame
+        if frame:
+            emit('ai_screen_frame', {'frame': frame})
+    
     # Notify others
     emit('user_joined', {'username': username}, broadcast=True, include_self=False)
 
@@ -707,7 +810,7 @@ def handle_chat_message(data):
         
         # Add to TTS queue only if TTS is available
         if TTS_AVAILABLE and data.get('tts_enabled', True):
-            state.tts_queue.append(response)
+            queue_tts(response)
             
     except Exception as e:
         print(f"Error in handle_chat_message: {e}")
@@ -819,7 +922,7 @@ def create_composite_image(client_b64, ai_b64):
     # Decode client image
     if client_b64:
         try:
-            img_bytes = base64.b64decode(client_b64)
+            img_bytes = b64decode(client_b64)
             img_array = np.frombuffer(img_bytes, dtype=np.uint8)
             img = cv2.imdecode(img_array, flags=cv2.IMREAD_COLOR)
             images.append(img)
@@ -830,7 +933,7 @@ def create_composite_image(client_b64, ai_b64):
     # Decode AI image
     if ai_b64:
         try:
-            img_bytes = base64.b64decode(ai_b64)
+            img_bytes = b64decode(ai_b64)
             img_array = np.frombuffer(img_bytes, dtype=np.uint8)
             img = cv2.imdecode(img_array, flags=cv2.IMREAD_COLOR)
             images.append(img)
@@ -845,10 +948,9 @@ def create_composite_image(client_b64, ai_b64):
     std_width = 800
     resized_images = []
     for img in images:
-        h, w, _ = img.shape
-        scale = std_width / w
-        new_h = int(h * scale)
-        resized_img = cv2.resize(img, (std_width, new_h), interpolation=cv2.INTER_AREA)
+        h, w = img.shape[:2]
+        new_h = h * std_width // w
+        resized_img = shrink(img, (std_width, new_h))
         resized_images.append(resized_img)
 
     # Add labels to images
@@ -862,19 +964,68 @@ def create_composite_image(client_b64, ai_b64):
     composite = cv2.vconcat(labeled_images)
     return composite
 
+# Maximum width used by analyze_screen_changes
+ANALYSIS_MAX_WIDTH = 640
+
+# Last decoded frame as (base64, image); shared by the change analysis and
+# the AI reaction so the same frame is only decoded once
+_last_decoded = (None, None)
+
+def decode_frame(frame_b64):
+    """Decode a base64 JPEG frame, reusing the previous result for the same frame."""
+    global _last_decoded
+    cached_b64, cached_img = _last_decoded
+    if cached_b64 is not None and frame_b64 == cached_b64:
+        return cached_img
+    img_bytes = b64decode(frame_b64)
+    img_array = np.frombuffer(img_bytes, dtype=np.uint8)
+    img = cv2.imdecode(img_array, flags=cv2.IMREAD_COLOR)
+    _last_decoded = (frame_b64, img)
+    return img
+
+# Grayscale and edge scratch images for analyze_screen_changes, reallocated
+# only when the analysis size changes
+_gray_buf = None
+_edges_buf = None
+
+# Difference hash of the last analysed frame; frames within this many bits
+# of it are treated as unchanged and skip the analysis entirely
+_last_dhash = None
+DHASH_MAX_DISTANCE = 4
+
+def frame_dhash(img):
+    """Return the 64-bit difference hash (dHash) of a BGR image."""
+    small = cv2.resize(img, (9, 8), interpolation=cv2.INTER_AREA)
+    small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    return int.from_bytes(np.packbits(small[:, 1:] > small[:, :-1]).tobytes(), 'big')
+
 def analyze_screen_changes(current_frame, previous_hash):
     """Analyze screen for significant changes with improved detection."""
+    global _gray_buf, _edges_buf, _last_dhash
     if current_frame is None:
         return None, []
     
     # Decode base64 image
     try:
-        img_bytes = base64.b64decode(current_frame)
-        img_array = np.frombuffer(img_bytes, dtype=np.uint8)
-        img = cv2.imdecode(img_array, flags=cv2.IMREAD_COLOR)
+        img = decode_frame(current_frame)
+        
+        # Cheap gate: a near-identical frame cannot produce new changes
+        dhash = frame_dhash(img)
+        if _last_dhash is not None and bin(dhash ^ _last_dhash).count('1') <= DHASH_MAX_DISTANCE:
+            return previous_hash, []
+        _last_dhash = dhash
+        
+        # Analyze a reduced copy: every heuristic below is relative to the
+        # frame size or an average, so full resolution only costs time
+        height, width = img.shape[:2]
+        if width > ANALYSIS_MAX_WIDTH:
+            img = shrink(img, (ANALYSIS_MAX_WIDTH, height * ANALYSIS_MAX_WIDTH // width))
         
         # Convert to grayscale for analysis
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        if _gray_buf is None or _gray_buf.shape != img.shape[:2]:
+            _gray_buf = np.empty(img.shape[:2], dtype=np.uint8)
+            _edges_buf = np.empty_like(_gray_buf)
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY, dst=_gray_buf)
         
         # Calculate hash for change detection
         resized = cv2.resize(gray, (16, 16))
@@ -894,12 +1045,19 @@ def analyze_screen_changes(current_frame, previous_hash):
                     height, width = img.shape[:2]
                     
                     # Enhanced window detection
-                    edges = cv2.Canny(gray, 50, 150)
+                    edges = cv2.Canny(gray, 50, 150, edges=_edges_buf)
                     contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-                    large_contours = [c for c in contours if cv2.contourArea(c) > (width * height * 0.05)]
                     
-                    # Detect window changes
-                    if len(large_contours) > 3:
+                    # Detect window changes: only need to know if more than 3
+                    # large contours exist, so stop counting at the 4th
+                    min_area = width * height * 0.05
+                    large_contours = 0
+                    for c in contours:
+                        if cv2.contourArea(c) > min_area:
+                            large_contours += 1
+                            if large_contours > 3:
+                                break
+                    if large_contours > 3:
                         changes.append("new_window")
                     
                     # Color analysis for better detection
@@ -993,10 +1151,8 @@ def dynamic_screen_monitor():
                 
                 # Generate AI reaction
                 try:
-                    # Decode the frame for AI analysis
-                    img_bytes = base64.b64decode(frames_to_analyze[0])
-                    img_array = np.frombuffer(img_bytes, dtype=np.uint8)
-                    img = cv2.imdecode(img_array, flags=cv2.IMREAD_COLOR)
+                    # Reuse the frame decoded by analyze_screen_changes
+                    img = decode_frame(frames_to_analyze[0])
                     
                     # Get all active streams for context
                     active_streams = []
@@ -1030,7 +1186,7 @@ def dynamic_screen_monitor():
                     
                     # Add to TTS queue if enabled
                     if TTS_AVAILABLE:
-                        state.tts_queue.append(response)
+                        queue_tts(response)
                         
                 except Exception as e:
                     print(f"Error generating dynamic reaction: {e}")
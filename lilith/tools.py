@@ -20,6 +20,8 @@ class LilithTools:
         """Initialize tools with an optional workspace directory."""
         self.workspace = workspace_dir or Path.cwd() / "lilith_workspace"
         self.workspace.mkdir(exist_ok=True)
+        # String form of the workspace, passed as cwd to every subprocess
+        self.workspace_str = str(self.workspace)
         
     def execute_python(self, code: str, timeout: int = 10) -> Dict[str, str]:
         """Execute Python code in a sandboxed environment."""
@@ -33,7 +35,7 @@ class LilithTools:
                 capture_output=True,
                 text=True,
                 timeout=timeout,
-                cwd=str(self.workspace)
+                cwd=self.workspace_str
             )
             return {
                 "success": proc.returncode == 0,
@@ -70,7 +72,7 @@ class LilithTools:
                 capture_output=True,
                 text=True,
                 timeout=timeout,
-                cwd=str(self.workspace)
+                cwd=self.workspace_str
             )
             
             return {
@@ -317,14 +319,14 @@ class LilithTools:
                     total_size += size
                     
             return {
-                "workspace_path": str(self.workspace),
+                "workspace_path": self.workspace_str,
                 "projects": projects,
                 "total_size": total_size,
                 "project_count": len(projects)
             }
         except Exception as e:
             return {
-                "workspace_path": str(self.workspace),
+                "workspace_path": self.workspace_str,
                 "projects": [],
                 "total_size": 0,
                 "project_count": 0,
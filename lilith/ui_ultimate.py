@@ -48,20 +48,32 @@ CLOUD_URL = "https://lilith.sl-anais-kiyori.cloud/ui"
 
 # System monitor
 class SystemMonitor:
-    def __init__(self, max_usage=90):
+    """Samples CPU/GPU/RAM usage on a background thread; get_usage() returns the latest sample."""
+    def __init__(self, max_usage=90, sample_interval=1.0):
         self.max_usage = max_usage
+        self.sample_interval = sample_interval
+        self._usage = self._measure(cpu=0, gpu=0)
+        threading.Thread(target=self._sample_loop, daemon=True).start()
         
-    def get_usage(self):
-        cpu = psutil.cpu_percent(interval=0.1)
-        gpu = 0
-        if GPU_AVAILABLE:
-            try:
-                gpus = GPUtil.getGPUs()
-                gpu = gpus[0].load * 100 if gpus else 0
-            except:
-                pass
+    def _measure(self, cpu, gpu):
         ram = psutil.virtual_memory().percent
         return {"cpu": cpu, "gpu": gpu, "ram": ram, "safe": cpu < self.max_usage and ram < self.max_usage}
+        
+    def _sample_loop(self):
+        while True:
+            # Blocks for sample_interval, which also paces the loop
+            cpu = psutil.cpu_percent(interval=self.sample_interval)
+            gpu = 0
+            if GPU_AVAILABLE:
+                try:
+                    gpus = GPUtil.getGPUs()
+                    gpu = gpus[0].load * 100 if gpus else 0
+                except:
+                    pass
+            self._usage = self._measure(cpu, gpu)
+        
+    def get_usage(self):
+        return self._usage
 
 system_monitor = SystemMonitor(max_usage=90)
 
@@ -144,7 +156,8 @@ class UltimateScreenCapture:
                             pass
                     
                     screenshot = sct.grab(monitor)
-                    frame = np.array(screenshot)
+                    # View mss' BGRA buffer in place; cvtColor below makes the only copy
+                    frame = np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(screenshot.height, screenshot.width, 4)
                     frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2RGB)
                     
                     if user_data['quality'] == 'low':
@@ -234,16 +247,14 @@ class UltimateScreenCapture:
                 try:
                     monitor = sct.monitors[monitor_index]
                     screenshot = sct.grab(monitor)
-                    frame = np.array(screenshot)
+                    # View mss' BGRA buffer in place; cvtColor below makes the only copy
+                    frame = np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(screenshot.height, screenshot.width, 4)
                     frame = cv2.cvtColor(frame, cv2.COLOR_BGRA2RGB)
                     
                     # Resize for performance
                     height, width = frame.shape[:2]
                     if width > 1280:
-                        scale = 1280 / width
-                        new_width = int(width * scale)
-                        new_height = int(height * scale)
-                        frame = cv2.resize(frame, (new_width, new_height))
+                        frame = cv2.resize(frame, (1280, height * 1280 // width))
                     
                     # Add label with monitor info
                     cv2.putText(frame, f"AI Screen - Monitor 2 (3440x1440)", (10, 30), 
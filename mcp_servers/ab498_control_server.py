@@ -1,7 +1,7 @@
 #!/usr/bin/env python
 """AB498 control server – version conforme README, avec alias & coords relatives."""
 from __future__ import annotations
-import argparse, io, base64, logging
+import argparse, io, base64, logging, functools
 from typing import Any, Dict
 
 import pyautogui
@@ -13,12 +13,20 @@ log = logging.getLogger("ab498")
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
 AI_CROP = {"x0": 0, "y0": 0, "w": None, "h": None}  # None = plein écran
+
+@functools.lru_cache(maxsize=1)
+def _screen_size() -> tuple[int, int]:
+    """Taille de l'écran, mise en cache (pyautogui.size() interroge l'OS à chaque appel).
+    Appeler ``_screen_size.cache_clear()`` après un changement de résolution."""
+    w, h = pyautogui.size()
+    return w, h
+
 # ---------------------------------------------------------------------
 def _rel2abs(rx: float | int | None, ry: float | int | None) -> tuple[int | None, int | None]:
     """Convertit (x_rel, y_rel) ∈ 0-1 dans la bbox AI_CROP (ou écran plein)."""
     if rx is None or ry is None:
         return rx, ry
-    screen_w, screen_h = pyautogui.size()
+    screen_w, screen_h = _screen_size()
     if AI_CROP["w"] is None:                      # flux == écran
         base_x, base_y, base_w, base_h = 0, 0, screen_w, screen_h
     else:
@@ -37,7 +45,7 @@ def _rel2abs(x: float | int | None,
     """Convertit (x_rel/y_rel) ∈ 0-1 en pixels écran ; sinon retourne les pixels."""
     if x is None or y is None:
         return x, y
-    w, h = pyautogui.size()
+    w, h = _screen_size()
     xf, yf = float(x), float(y)
     if 0.0 <= xf <= 1.0 and 0.0 <= yf <= 1.0:
         xf *= w
@@ -62,7 +70,7 @@ def _png(img: Image.Image) -> str:
     return "data:image/png;base64," + base64.b64encode(buf.getvalue()).decode()
 
 def _rel2abs(rx: float, ry: float) -> tuple[int, int]:
-    w, h = pyautogui.size()
+    w, h = _screen_size()
     return int(rx * w), int(ry * h)
 
 def _extract_xy(p: Dict[str, Any]) -> tuple[int | None, int | None]:
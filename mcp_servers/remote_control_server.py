@@ -5,6 +5,8 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from base_server import BaseMCPServer, create_argument_parser
 from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import contextlib
 import base64
 import time
 import io
@@ -22,17 +24,27 @@ except ImportError as e:
     print(f"Warning: Some remote control features unavailable: {e}")
     CONTROL_AVAILABLE = False
 
+# Minimum spacing between input actions. Enforced by _paced_input instead of
+# pyautogui.PAUSE, which also slept after read-only calls such as position()
+INPUT_MIN_INTERVAL_NS = 100_000_000
+
 
 class RemoteControlServer(BaseMCPServer):
     """Remote control server for mouse, keyboard, and screen operations."""
     
     def __init__(self, port: int = 3011):
         super().__init__("remote_control", port)
+        # mss instance shared by all screen methods (they all run on the event loop thread)
+        self._sct = None
+        # Earliest time.monotonic_ns() at which the next input action may run
+        self._next_input_ns = 0
+        # End of the last input action plus the minimum interval
+        self._settle_ns = 0
         
         # Configure pyautogui safety features
         if CONTROL_AVAILABLE:
             pyautogui.FAILSAFE = True  # Move mouse to corner to abort
-            pyautogui.PAUSE = 0.1  # Pause between actions
+            pyautogui.PAUSE = 0  # Spacing between actions is handled by _paced_input
         
         # Register methods
         self.register_method("mouse_move", self.mouse_move)
@@ -55,16 +67,42 @@ class RemoteControlServer(BaseMCPServer):
         self.register_method("get_window_list", self.get_window_list)
         self.register_method("activate_window", self.activate_window)
         
+    def _get_sct(self):
+        """Return the shared mss instance, creating it on first use."""
+        if self._sct is None:
+            self._sct = mss.mss()
+        return self._sct
+        
+    @contextlib.asynccontextmanager
+    async def _paced_input(self):
+        """Run an input action at least the minimum interval after the previous one ended."""
+        now = time.monotonic_ns()
+        # Reserve the slot before awaiting so concurrent RPC handlers queue up
+        # behind each other instead of all reading the same deadline
+        start = max(now, self._next_input_ns)
+        self._next_input_ns = start + INPUT_MIN_INTERVAL_NS
+        # Actions block the event loop, so a waiter can wake right as a long one
+        # (a slow move, a drag, typewrite) returns; it still owes the settle gap
+        while (wait := max(start, self._settle_ns) - time.monotonic_ns()) > 0:
+            await asyncio.sleep(wait / 1e9)
+        try:
+            yield
+        finally:
+            # Like pyautogui.PAUSE, the gap is counted from the end of the action
+            self._settle_ns = time.monotonic_ns() + INPUT_MIN_INTERVAL_NS
+            self._next_input_ns = max(self._next_input_ns, self._settle_ns)
+        
     async def mouse_move(self, x: int, y: int, duration: float = 0.5, relative: bool = False) -> Dict[str, Any]:
         """Move mouse to coordinates."""
         if not CONTROL_AVAILABLE:
             return {"error": "Remote control not available"}
             
         try:
-            if relative:
-                pyautogui.moveRel(x, y, duration=duration)
-            else:
-                pyautogui.moveTo(x, y, duration=duration)
+            async with self._paced_input():
+                if relative:
+                    pyautogui.moveRel(x, y, duration=duration)
+                else:
+                    pyautogui.moveTo(x, y, duration=duration)
                 
             new_x, new_y = pyautogui.position()
             return {"success": True, "position": {"x": new_x, "y": new_y}}
@@ -78,10 +116,11 @@ class RemoteControlServer(BaseMCPServer):
             return {"error": "Remote control not available"}
             
         try:
-            if x is not None and y is not None:
-                pyautogui.click(x, y, button=button, clicks=clicks, interval=interval)
-            else:
-                pyautogui.click(button=button, clicks=clicks, interval=interval)
+            async with self._paced_input():
+                if x is not None and y is not None:
+                    pyautogui.click(x, y, button=button, clicks=clicks, interval=interval)
+                else:
+                    pyautogui.click(button=button, clicks=clicks, interval=interval)
                 
             return {"success": True, "button": button, "clicks": clicks}
             
@@ -94,10 +133,11 @@ class RemoteControlServer(BaseMCPServer):
             return {"error": "Remote control not available"}
             
         try:
-            if relative:
-                pyautogui.dragRel(x, y, duration=duration, button=button)
-            else:
-                pyautogui.dragTo(x, y, duration=duration, button=button)
+            async with self._paced_input():
+                if relative:
+                    pyautogui.dragRel(x, y, duration=duration, button=button)
+                else:
+                    pyautogui.dragTo(x, y, duration=duration, button=button)
                 
             return {"success": True}
             
@@ -110,10 +150,11 @@ class RemoteControlServer(BaseMCPServer):
             return {"error": "Remote control not available"}
             
         try:
-            if x is not None and y is not None:
-                pyautogui.moveTo(x, y)
-                
-            pyautogui.scroll(clicks)
+            async with self._paced_input():
+                if x is not None and y is not None:
+                    pyautogui.moveTo(x, y)
+                    
+                pyautogui.scroll(clicks)
             return {"success": True, "scrolled": clicks}
             
         except Exception as e:
@@ -137,7 +178,8 @@ class RemoteControlServer(BaseMCPServer):
             return {"error": "Remote control not available"}
             
         try:
-            pyautogui.typewrite(text, interval=interval)
+            async with self._paced_input():
+                pyautogui.typewrite(text, interval=interval)
             return {"success": True, "typed": text}
             
         except Exception as e:
@@ -149,7 +191,8 @@ class RemoteControlServer(BaseMCPServer):
             return {"error": "Remote control not available"}
             
         try:
-            pyautogui.hotkey(*keys)
+            async with self._paced_input():
+                pyautogui.hotkey(*keys)
             return {"success": True, "keys": keys}
             
         except Exception as e:
@@ -161,7 +204,8 @@ class RemoteControlServer(BaseMCPServer):
             return {"error": "Remote control not available"}
             
         try:
-            pyautogui.keyDown(key)
+            async with self._paced_input():
+                pyautogui.keyDown(key)
             return {"success": True, "key": key}
             
         except Exception as e:
@@ -173,7 +217,8 @@ class RemoteControlServer(BaseMCPServer):
             return {"error": "Remote control not available"}
             
         try:
-            pyautogui.keyUp(key)
+            async with self._paced_input():
+                pyautogui.keyUp(key)
             return {"success": True, "key": key}
             
         except Exception as e:
@@ -185,36 +230,37 @@ class RemoteControlServer(BaseMCPServer):
             return {"error": "Remote control not available"}
             
         try:
-            with mss.mss() as sct:
-                if monitor is not None:
-                    if monitor >= len(sct.monitors):
-                        return {"error": f"Monitor {monitor} not found"}
-                    mon = sct.monitors[monitor]
-                elif region:
-                    if len(region) != 4:
-                        return {"error": "Region must be [x, y, width, height]"}
-                    mon = {"left": region[0], "top": region[1], 
-                           "width": region[2], "height": region[3]}
-                else:
-                    mon = sct.monitors[0]  # All monitors
-                    
-                screenshot = sct.grab(mon)
-                
-                # Convert to PIL Image
-                img = Image.frombytes("RGB", screenshot.size, screenshot.bgra, "raw", "BGRX")
-                
-                # Convert to base64
-                buffer = io.BytesIO()
-                img.save(buffer, format="PNG")
-                img_base64 = base64.b64encode(buffer.getvalue()).decode()
+            sct = self._get_sct()
+            if monitor is not None:
+                if monitor >= len(sct.monitors):
+                    return {"error": f"Monitor {monitor} not found"}
+                mon = sct.monitors[monitor]
+            elif region:
+                if len(region) != 4:
+                    return {"error": "Region must be [x, y, width, height]"}
+                # Only the requested rectangle is grabbed
+                mon = {"left": region[0], "top": region[1], 
+                       "width": region[2], "height": region[3]}
+            else:
+                mon = sct.monitors[0]  # All monitors
                 
-                return {
-                    "success": True,
-                    "image": img_base64,
-                    "width": img.width,
-                    "height": img.height,
-                    "format": "base64_png"
-                }
+            screenshot = sct.grab(mon)
+            
+            # Convert to PIL Image straight from the raw buffer (no bgra copy)
+            img = Image.frombytes("RGB", screenshot.size, screenshot.raw, "raw", "BGRX")
+            
+            # Convert to base64
+            buffer = io.BytesIO()
+            img.save(buffer, format="PNG")
+            img_base64 = base64.b64encode(buffer.getvalue()).decode()
+            
+            return {
+                "success": True,
+                "image": img_base64,
+                "width": img.width,
+                "height": img.height,
+                "format": "base64_png"
+            }
                 
         except Exception as e:
             return {"error": str(e)}
@@ -229,16 +275,16 @@ class RemoteControlServer(BaseMCPServer):
                 width, height = pyautogui.size()
                 return {"width": width, "height": height}
             else:
-                with mss.mss() as sct:
-                    if monitor >= len(sct.monitors):
-                        return {"error": f"Monitor {monitor} not found"}
-                    mon = sct.monitors[monitor]
-                    return {
-                        "width": mon["width"],
-                        "height": mon["height"],
-                        "left": mon["left"],
-                        "top": mon["top"]
-                    }
+                sct = self._get_sct()
+                if monitor >= len(sct.monitors):
+                    return {"error": f"Monitor {monitor} not found"}
+                mon = sct.monitors[monitor]
+                return {
+                    "width": mon["width"],
+                    "height": mon["height"],
+                    "left": mon["left"],
+                    "top": mon["top"]
+                }
                     
         except Exception as e:
             return {"error": str(e)}
@@ -308,21 +354,19 @@ class RemoteControlServer(BaseMCPServer):
             return {"error": "Remote control not available"}
             
         try:
-            # Use mss for pixel color
-            with mss.mss() as sct:
-                # Capture 1x1 pixel
-                mon = {"left": x, "top": y, "width": 1, "height": 1}
-                screenshot = sct.grab(mon)
-                
-                # Get pixel color
-                pixel = screenshot.pixel(0, 0)  # BGRA format
-                
-                return {
-                    "r": pixel[2],
-                    "g": pixel[1],
-                    "b": pixel[0],
-                    "hex": f"#{pixel[2]:02x}{pixel[1]:02x}{pixel[0]:02x}"
-                }
+            # Use mss for pixel color, capturing only a 1x1 pixel
+            mon = {"left": x, "top": y, "width": 1, "height": 1}
+            screenshot = self._get_sct().grab(mon)
+            
+            # Raw buffer is BGRA
+            b, g, r = screenshot.raw[0], screenshot.raw[1], screenshot.raw[2]
+            
+            return {
+                "r": r,
+                "g": g,
+                "b": b,
+                "hex": f"#{r:02x}{g:02x}{b:02x}"
+            }
                 
         except Exception as e:
             return {"error": str(e)}